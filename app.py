@@ -1,21 +1,20 @@
 # app.py
 import io
-import re
 import json
 import os
+import threading
 import base64
-import datetime as dt
-from typing import Dict, List
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 import pandas as pd
 import streamlit as st
 import altair as alt
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
 import requests
+from requests.adapters import HTTPAdapter
+
+from pdf_parse import parse_many
 
 # =========================================================
 # APP CONFIG + BLACK THEME
@@ -132,62 +131,59 @@ alt.themes.register('black_theme', black_theme)
 alt.themes.enable('black_theme')
 
 # =========================================================
-# HELPERS
+# KPI HTML TEMPLATES
 # =========================================================
-def _clean_int(s):
-    return int(s.replace(",", ""))
+_TOP_KPI_TMPL = """
+<div style="display:flex;gap:20px;justify-content:space-between;margin-bottom:10px;">
+    <div style="flex:1;background-color:#111111;border:1px solid #222222;
+                border-radius:14px;padding:16px;text-align:center;">
+        <p style="margin:0;font-size:16px;color:#aaaaaa;">FTTH Customers</p>
+        <p style="margin:0;font-size:28px;font-weight:700;color:#49d0ff;">{act:,}</p>
+    </div>
+    <div style="flex:1;background-color:#111111;border:1px solid #222222;
+                border-radius:14px;padding:16px;text-align:center;">
+        <p style="margin:0;font-size:16px;color:#aaaaaa;">Total Revenue</p>
+        <p style="margin:0;font-size:28px;font-weight:700;color:#3ddc97;">${amt:,.2f}</p>
+    </div>
+    <div style="flex:1;background-color:#111111;border:1px solid #222222;
+                border-radius:14px;padding:16px;text-align:center;">
+        <p style="margin:0;font-size:16px;color:#aaaaaa;">ARPU</p>
+        <p style="margin:0;font-size:28px;font-weight:700;color:#3ddc97;">${arpu:,.2f}</p>
+    </div>
+</div>
+"""
 
-def _clean_amt(s):
-    return float(s.replace(",", "").replace("(", "-").replace(")", ""))
+# Same style as the top row; formatted with by_status[s] plus a title.
+_BOX_TMPL = """
+    <div style="background-color:#111111;border:1px solid #222222;
+                border-radius:14px;padding:16px;text-align:center;">
+        <p style="margin:0;font-size:16px;color:#aaaaaa;">{title}</p>
+        <p style="margin:0;font-size:28px;font-weight:700;color:#49d0ff;">{act:,}</p>
+        <p style="margin:0;font-size:14px;color:#3ddc97;">
+            Rev ${amt:,.2f} • ARPU ${rpc:,.2f}
+        </p>
+    </div>"""
 
-def _read_pdf_text(pdf_bytes: bytes) -> str:
-    import pdfplumber
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        return "\n".join((p.extract_text() or "") for p in pdf.pages)
+_KPI_HEADER_TMPL = (
+    '{top}<hr style="border:none;border-top:1px solid #222222;margin:16px 0;">'
+    '<div style="display:grid;grid-template-columns:repeat(auto-fit,minmax(220px,1fr));gap:20px;">{boxes}</div>'
+)
 
-def _extract_date_label(text: str, fallback_label: str) -> str:
-    m = re.search(r"Date:\s*([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})", text)
-    if m:
-        try:
-            return dt.date(int(m.group(3)), int(m.group(1)), int(m.group(2))).isoformat()
-        except Exception:
-            pass
-    return fallback_label
-
-def parse_one_pdf(pdf_bytes: bytes):
-    text = _read_pdf_text(pdf_bytes)
-    compact = re.sub(r"\s+", " ", text)
-    header_pat = re.compile(
-        r'Customer Status\s*",\s*"(ACT|COM|VIP)"\s*,\s*"(Active residential|Active Commercial|VIP)"\s*,\s*"([0-9,]+)"\s*,\s*"([0-9,]+)"',
-        re.IGNORECASE)
-    starts = [(m.group(1).upper(), _clean_int(m.group(4)), m.start(), m.end())
-              for m in header_pat.finditer(compact)]
-    by_status = {"ACT": {"act": 0, "amt": 0.0}, "COM": {"act": 0, "amt": 0.0}, "VIP": {"act": 0, "amt": 0.0}}
-    for status, act, s, e in starts:
-        win = compact[max(0, s - 300): s]
-        dollars = list(re.finditer(r"\$([0-9][0-9,.\(\)-]*)", win))
-        amt = _clean_amt(dollars[-1].group(1)) if dollars else 0.0
-        by_status[status]["act"] += act
-        by_status[status]["amt"] += amt
-    m_total = re.search(r"Total\s*:\s*([0-9,]+)\s+([0-9,]+)\s+\$([0-9,.\(\)-]+)", compact)
-    if m_total:
-        grand = {
-            "subs": _clean_int(m_total.group(1)),
-            "act": _clean_int(m_total.group(2)),
-            "amt": _clean_amt(m_total.group(3))
-        }
-    else:
-        grand = {
-            "act": sum(v["act"] for v in by_status.values()),
-            "amt": sum(v["amt"] for v in by_status.values())
-        }
-    return grand, by_status, text
+_STATUS_TITLES = {
+    "ACT": "ACT — Active Residential",
+    "COM": "COM — Active Commercial",
+    "VIP": "VIP",
+}
 
 # =========================================================
 # SNAPSHOT FIGURE - FIXED: NO CRASH ON ZERO REVENUE
 # =========================================================
 def build_snapshot_figure(period_label, grand, by_status):
-    fig = plt.figure(figsize=(10, 6), dpi=150, facecolor='#111111')
+    # Imported here so matplotlib only loads once an export is prepared. A bare
+    # Figure renders through its own canvas, with no pyplot state to close.
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6), dpi=100, facecolor='#111111')
     fig.patch.set_facecolor('#111111')
 
     ax_title = fig.add_axes([0.05, 0.82, 0.9, 0.15]); ax_title.axis("off")
@@ -203,16 +199,13 @@ def build_snapshot_figure(period_label, grand, by_status):
             spine.set_color('#222222')
 
     overall_arpu = (grand["amt"]/grand["act"]) if grand["act"] else 0
-    act_rpc = by_status["ACT"]["amt"]/by_status["ACT"]["act"] if by_status["ACT"]["act"] else 0
-    com_rpc = by_status["COM"]["amt"]/by_status["COM"]["act"] if by_status["COM"]["act"] else 0
-    vip_rpc = by_status["VIP"]["amt"]/by_status["VIP"]["act"] if by_status["VIP"]["act"] else 0
 
     lines = [
         f"FTTH Dashboard — {period_label}",
         f"FTTH Customers: {grand['act']:,} | Total Revenue: ${grand['amt']:,.2f} | ARPU: ${overall_arpu:,.2f}",
-        f"ACT: {by_status['ACT']['act']:,} Rev ${by_status['ACT']['amt']:,.2f} ARPU ${act_rpc:,.2f} "
-        f"COM: {by_status['COM']['act']:,} Rev ${by_status['COM']['amt']:,.2f} ARPU ${com_rpc:,.2f} "
-        f"VIP: {by_status['VIP']['act']:,} Rev ${by_status['VIP']['amt']:,.2f} ARPU ${vip_rpc:,.2f}"
+        f"ACT: {by_status['ACT']['act']:,} Rev ${by_status['ACT']['amt']:,.2f} ARPU ${by_status['ACT']['rpc']:,.2f} "
+        f"COM: {by_status['COM']['act']:,} Rev ${by_status['COM']['amt']:,.2f} ARPU ${by_status['COM']['rpc']:,.2f} "
+        f"VIP: {by_status['VIP']['act']:,} Rev ${by_status['VIP']['amt']:,.2f} ARPU ${by_status['VIP']['rpc']:,.2f}"
     ]
 
     ax_title.text(0.01, 0.9, lines[0], fontsize=16, weight="bold", color='#e6e6e6')
@@ -251,56 +244,43 @@ def build_snapshot_figure(period_label, grand, by_status):
 # =========================================================
 # EXPORT FUNCTIONS - BLACK PNG & PDF
 # =========================================================
-def export_snapshot_png(period_label, grand, by_status):
+@st.cache_data(show_spinner=False)
+def export_snapshots(period_label, grand, by_status):
+    # One figure, saved twice: PNG, then a vector PDF straight from matplotlib
+    # (no PNG raster or reportlab pass).
     fig = build_snapshot_figure(period_label, grand, by_status)
-    buf = io.BytesIO()
+    png_buf = io.BytesIO()
     fig.savefig(
-        buf,
+        png_buf,
         format="png",
-        bbox_inches="tight",
+        bbox_inches=None,
+        pad_inches=0,
         facecolor='#111111',
         edgecolor='none',
-        dpi=150
+        dpi=100,
+        # Fast zlib level: a few percent larger file for noticeably quicker encoding.
+        pil_kwargs={"compress_level": 1}
     )
-    plt.close(fig)
-    buf.seek(0)
-    return buf.getvalue()
-
-def export_snapshot_pdf(period_label, grand, by_status):
-    png_bytes = export_snapshot_png(period_label, grand, by_status)
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=letter)
-    width, height = letter
-
-    c.setFillColorRGB(0, 0, 0)
-    c.rect(0, 0, width, height, fill=1, stroke=0)
-
-    c.setTitle(f"FTTH Dashboard - {period_label}")
-    c.setFont("Helvetica-Bold", 14)
-    c.setFillColorRGB(0.9, 0.9, 0.9)
-    c.drawString(0.75*inch, height - 1.0*inch, f"FTTH Dashboard — {period_label}")
-
-    img_reader = ImageReader(io.BytesIO(png_bytes))
-    img_w = width - 1.5*inch
-    img_h = img_w * 0.55
-    c.drawImage(
-        img_reader,
-        0.75*inch,
-        height - 1.0*inch - img_h - 0.25*inch,
-        width=img_w,
-        height=img_h,
-        preserveAspectRatio=True,
-        mask='auto'
+    pdf_buf = io.BytesIO()
+    fig.savefig(
+        pdf_buf,
+        format="pdf",
+        facecolor='#111111',
+        edgecolor='none',
+        metadata={"Title": f"FTTH Dashboard - {period_label}"}
     )
-
-    c.showPage()
-    c.save()
-    buf.seek(0)
-    return buf.getvalue()
+    return png_buf.getvalue(), pdf_buf.getvalue()
 
 # =========================================================
 # GITHUB HELPERS
 # =========================================================
+@st.cache_resource
+def _github_session() -> requests.Session:
+    # One keep-alive pool per process, so repeated API calls skip the TLS handshake.
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+    return session
+
 def get_github_config():
     try:
         gh_cfg = st.secrets["github"]
@@ -314,20 +294,9 @@ def get_github_config():
         st.warning("GitHub secrets not configured correctly under [github].")
         return None, None, None, None
 
-def save_upload_to_local_and_github(filename: str, file_bytes: bytes):
-    local_folder = "fiber"
-    os.makedirs(local_folder, exist_ok=True)
-    local_path = os.path.join(local_folder, filename)
-    try:
-        with open(local_path, "wb") as f:
-            f.write(file_bytes)
-        st.success(f"Saved file locally: {local_path}")
-    except Exception as e:
-        st.error(f"Failed to save file locally: {e}")
-
-    token, repo, branch, remote_prefix = get_github_config()
-    if not token or not repo:
-        return
+def _push_to_github(session, filename: str, file_bytes: bytes, token, repo, branch, remote_prefix, sha=None):
+    # Returns (ok, message, blob_sha); the caller reports it. Pass the blob sha
+    # from an earlier push to update the file with a single PUT.
     remote_path = remote_prefix + filename
     api_url = f"https://api.github.com/repos/{repo}/contents/{remote_path}"
     headers = {
@@ -335,10 +304,6 @@ def save_upload_to_local_and_github(filename: str, file_bytes: bytes):
         "Accept": "application/vnd.github+json"
     }
     content_b64 = base64.b64encode(file_bytes).decode("utf-8")
-    sha = None
-    get_resp = requests.get(api_url, headers=headers)
-    if get_resp.status_code == 200:
-        sha = get_resp.json().get("sha")
     payload = {
         "message": f"Add/update {filename} via FTTH Dashboard",
         "content": content_b64,
@@ -346,11 +311,57 @@ def save_upload_to_local_and_github(filename: str, file_bytes: bytes):
     }
     if sha:
         payload["sha"] = sha
-    put_resp = requests.put(api_url, headers=headers, json=payload)
+    # Optimistically create (or, with a known sha, update) the file; only an
+    # unknown existing file (422 asking for its sha) or a stale sha (409) costs
+    # the extra GET and a second PUT.
+    put_resp = session.put(api_url, headers=headers, json=payload)
+    if put_resp.status_code == 409 or (put_resp.status_code == 422 and "sha" in put_resp.text):
+        get_resp = session.get(api_url, headers=headers, params={"ref": branch})
+        if get_resp.status_code == 200:
+            payload["sha"] = get_resp.json().get("sha")
+            put_resp = session.put(api_url, headers=headers, json=payload)
     if put_resp.status_code in (200, 201):
-        st.success(f"Pushed to GitHub: {repo}/{remote_path}")
-    else:
-        st.error(f"GitHub upload failed ({put_resp.status_code}): {put_resp.text}")
+        blob_sha = put_resp.json().get("content", {}).get("sha")
+        return True, f"Pushed to GitHub: {repo}/{remote_path}", blob_sha
+    return False, f"GitHub upload failed ({put_resp.status_code}): {put_resp.text}", None
+
+def save_uploads_to_local_and_github(files: List[Tuple[str, bytes]]):
+    local_folder = "fiber"
+    os.makedirs(local_folder, exist_ok=True)
+    for filename, file_bytes in files:
+        local_path = os.path.join(local_folder, filename)
+        try:
+            with open(local_path, "wb") as f:
+                f.write(file_bytes)
+            st.success(f"Saved file locally: {local_path}")
+        except Exception as e:
+            st.error(f"Failed to save file locally: {e}")
+
+    token, repo, branch, remote_prefix = get_github_config()
+    if not token or not repo or not files:
+        return
+    # One push at a time: every Contents-API PUT is a commit on the branch, and
+    # concurrent PUTs race on the branch ref (409). The shared session still
+    # saves the TLS handshake per request.
+    session = _github_session()
+    # Remote path -> (sha256 of the bytes this session pushed, resulting blob sha).
+    # Upload mode calls this on every rerun; unchanged files are not pushed again.
+    pushed = st.session_state.setdefault("github_pushed", {})
+    for filename, file_bytes in files:
+        remote_key = f"{repo}:{branch}:{remote_prefix}{filename}"
+        digest = hashlib.sha256(file_bytes).hexdigest()
+        prev = pushed.get(remote_key)
+        if prev and prev[0] == digest:
+            continue
+        ok, msg, blob_sha = _push_to_github(
+            session, filename, file_bytes, token, repo, branch, remote_prefix,
+            sha=prev[1] if prev else None,
+        )
+        if ok:
+            pushed[remote_key] = (digest, blob_sha)
+            st.success(msg)
+        else:
+            st.error(msg)
 
 def list_github_files_in_fiber():
     token, repo, branch, remote_prefix = get_github_config()
@@ -362,7 +373,7 @@ def list_github_files_in_fiber():
         "Authorization": f"token {token}",
         "Accept": "application/vnd.github+json"
     }
-    resp = requests.get(api_url, headers=headers)
+    resp = _github_session().get(api_url, headers=headers)
     if resp.status_code != 200:
         st.error(f"Failed to list GitHub files ({resp.status_code}): {resp.text}")
         return []
@@ -370,16 +381,71 @@ def list_github_files_in_fiber():
     files = [item for item in items if item.get("type") == "file"]
     return files
 
-def load_github_file_from_github(file_info) -> bytes:
+@st.cache_data(ttl=600, show_spinner=False)
+def _download_github_file(sha: str, _download_url: str) -> bytes:
+    # Keyed on the blob sha only; the download URL may carry a rotating token.
+    resp = _github_session().get(_download_url)
+    resp.raise_for_status()
+    return resp.content
+
+def _fetch_github_file(file_info):
+    # Runs on a worker thread: return (bytes, error) instead of calling st.error.
     download_url = file_info.get("download_url")
     if not download_url:
-        st.error("No download URL found for selected file.")
-        return b""
-    resp = requests.get(download_url)
-    if resp.status_code != 200:
-        st.error(f"Failed to download file from GitHub ({resp.status_code}): {resp.text}")
-        return b""
-    return resp.content
+        return b"", "No download URL found for selected file."
+    try:
+        return _download_github_file(file_info.get("sha") or download_url, download_url), None
+    except requests.HTTPError as e:
+        return b"", f"Failed to download file from GitHub ({e.response.status_code}): {e.response.text}"
+
+def load_github_files_from_github(file_infos) -> List[bytes]:
+    if not file_infos:
+        return []
+    with ThreadPoolExecutor(max_workers=min(8, len(file_infos))) as ex:
+        results = list(ex.map(_fetch_github_file, file_infos))
+    for _, err in results:
+        if err:
+            st.error(err)
+    return [content for content, _ in results]
+
+# =========================================================
+# PARSE CACHE
+# =========================================================
+_PARSE_CACHE_MAX_ENTRIES = 64
+
+@st.cache_resource
+def _parse_cache():
+    # sha256 of the PDF bytes -> (grand, by_status, report_date), shared by all
+    # sessions and kept in least-recently-used order. Kept per file, so changing
+    # the selection only parses new files; the lock guards it across sessions.
+    return OrderedDict(), threading.Lock()
+
+def parse_pdfs(jobs):
+    """Turn (pdf_bytes, fallback_label) jobs into (period, grand, by_status) records."""
+    cache, lock = _parse_cache()
+    keys = [hashlib.sha256(pdf_bytes).hexdigest() for pdf_bytes, _ in jobs]
+    # Look up on the script thread before dispatch; only the misses go to the
+    # worker pool, and identical files within a batch are parsed once.
+    found = {}
+    with lock:
+        for key in keys:
+            if key in cache:
+                cache.move_to_end(key)
+                found[key] = cache[key]
+    misses = {key: pdf_bytes for key, (pdf_bytes, _) in zip(keys, jobs) if key not in found}
+    if misses:
+        with st.spinner("Parsing reports..."):
+            parsed = parse_many(list(misses.values()))
+        with lock:
+            for key, result in zip(misses, parsed):
+                found[key] = cache[key] = result
+            while len(cache) > _PARSE_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+    records = []
+    for key, (_, label) in zip(keys, jobs):
+        grand, by_status, report_date = found[key]
+        records.append((report_date or label, grand, by_status))
+    return records
 
 # =========================================================
 # INPUT / PARSE
@@ -390,8 +456,6 @@ source_choice = st.radio(
     horizontal=True
 )
 
-records: List[Dict] = []
-
 if source_choice == "Upload new PDFs":
     uploaded_files = st.file_uploader(
         "Upload 'Subscriber Counts v2' PDFs",
@@ -401,17 +465,15 @@ if source_choice == "Upload new PDFs":
     if not uploaded_files:
         st.info("Upload at least one PDF to view FTTH KPIs.")
         st.stop()
+    jobs = []
+    to_save = []
     for i, up in enumerate(uploaded_files, start=1):
-        pdf_bytes = up.read()
+        pdf_bytes = up.getvalue()
         if not pdf_bytes:
             continue
-        save_upload_to_local_and_github(up.name, pdf_bytes)
-        grand, by_status, raw = parse_one_pdf(pdf_bytes)
-        period = _extract_date_label(raw, fallback_label=up.name or f"File {i}")
-        for s in ["ACT", "COM", "VIP"]:
-            c_ = by_status[s]["act"]
-            by_status[s]["rpc"] = (by_status[s]["amt"]/c_) if c_ else 0
-        records.append({"period": period, "grand": grand, "by_status": by_status})
+        to_save.append((up.name, pdf_bytes))
+        jobs.append((pdf_bytes, up.name or f"File {i}"))
+    save_uploads_to_local_and_github(to_save)
 else:
     gh_files = list_github_files_in_fiber()
     if not gh_files:
@@ -431,161 +493,102 @@ else:
     if not selected_names:
         st.info("Select at least one PDF from GitHub to continue.")
         st.stop()
-    for i, name in enumerate(selected_names, start=1):
-        file_info = name_to_item[name]
-        pdf_bytes = load_github_file_from_github(file_info)
-        if not pdf_bytes:
-            continue
-        grand, by_status, raw = parse_one_pdf(pdf_bytes)
-        period = _extract_date_label(raw, fallback_label=name)
-        for s in ["ACT", "COM", "VIP"]:
-            c_ = by_status[s]["act"]
-            by_status[s]["rpc"] = (by_status[s]["amt"]/c_) if c_ else 0
-        records.append({"period": period, "grand": grand, "by_status": by_status})
+    downloads = load_github_files_from_github([name_to_item[name] for name in selected_names])
+    jobs = [(pdf_bytes, name) for name, pdf_bytes in zip(selected_names, downloads) if pdf_bytes]
+
+records = parse_pdfs(jobs)
 
 if not records:
     st.error("No valid records loaded from the selected source.")
     st.stop()
 
-records.sort(key=lambda r: r["period"])
+# One row per (record, status); ARPU and period ordering are computed column-wise.
+status_df = pd.DataFrame(
+    [(i, period, s, v["act"], v["amt"])
+     for i, (period, _, by_status) in enumerate(records)
+     for s, v in by_status.items()],
+    columns=["record", "period", "status", "act", "amt"],
+)
+status_df["rpc"] = (status_df["amt"] / status_df["act"].where(status_df["act"] > 0)).fillna(0.0)
+status_df = status_df.sort_values(["period", "record"], kind="stable")
 
 # =========================================================
 # CURRENT REPORT
 # =========================================================
-r = records[-1]
-grand = r["grand"]
-by_status = r["by_status"]
-period_label = r["period"]
+latest = status_df["record"].iloc[-1]
+period_label, grand, _ = records[latest]
+current = status_df[status_df["record"] == latest]
+by_status = current.set_index("status")[["act", "amt", "rpc"]].to_dict("index")
 overall_arpu = (grand["amt"]/grand["act"]) if grand["act"] else 0
 
-# --- TOP KPI ROW ---
-html_top = f"""
-<div style="display:flex;gap:20px;justify-content:space-between;margin-bottom:10px;">
-    <div style="flex:1;background-color:#111111;border:1px solid #222222;
-                border-radius:14px;padding:16px;text-align:center;">
-        <p style="margin:0;font-size:16px;color:#aaaaaa;">FTTH Customers</p>
-        <p style="margin:0;font-size:28px;font-weight:700;color:#49d0ff;">{grand['act']:,}</p>
-    </div>
-    <div style="flex:1;background-color:#111111;border:1px solid #222222;
-                border-radius:14px;padding:16px;text-align:center;">
-        <p style="margin:0;font-size:16px;color:#aaaaaa;">Total Revenue</p>
-        <p style="margin:0;font-size:28px;font-weight:700;color:#3ddc97;">${grand['amt']:,.2f}</p>
-    </div>
-    <div style="flex:1;background-color:#111111;border:1px solid #222222;
-                border-radius:14px;padding:16px;text-align:center;">
-        <p style="margin:0;font-size:16px;color:#aaaaaa;">ARPU</p>
-        <p style="margin:0;font-size:28px;font-weight:700;color:#3ddc97;">${overall_arpu:,.2f}</p>
-    </div>
-</div>
-"""
-st.markdown(html_top, unsafe_allow_html=True)
-st.divider()
-
-# --- KPI BOXES (SAME STYLE AS TOP ROW) ---
-def metric_box(col, title, value, subtitle1, subtitle2):
-    html = f"""
-    <div style="background-color:#111111;border:1px solid #222222;
-                border-radius:14px;padding:16px;text-align:center;">
-        <p style="margin:0;font-size:16px;color:#aaaaaa;">{title}</p>
-        <p style="margin:0;font-size:28px;font-weight:700;color:#49d0ff;">{value:,}</p>
-        <p style="margin:0;font-size:14px;color:#3ddc97;">
-            {subtitle1} • {subtitle2}
-        </p>
-    </div>
-    """
-    col.markdown(html, unsafe_allow_html=True)
-
-c1, c2, c3 = st.columns(3)
-
-metric_box(
-    c1,
-    "ACT — Active Residential",
-    by_status["ACT"]["act"],
-    f"Rev ${by_status['ACT']['amt']:,.2f}",
-    f"ARPU ${by_status['ACT']['rpc']:,.2f}"
-)
-
-metric_box(
-    c2,
-    "COM — Active Commercial",
-    by_status["COM"]["act"],
-    f"Rev ${by_status['COM']['amt']:,.2f}",
-    f"ARPU ${by_status['COM']['rpc']:,.2f}"
-)
-
-metric_box(
-    c3,
-    "VIP",
-    by_status["VIP"]["act"],
-    f"Rev ${by_status['VIP']['amt']:,.2f}",
-    f"ARPU ${by_status['VIP']['rpc']:,.2f}"
+# --- TOP KPI ROW + STATUS BOXES: one markdown element ---
+html_top = _TOP_KPI_TMPL.format_map({"act": grand["act"], "amt": grand["amt"], "arpu": overall_arpu})
+html_boxes = "".join(
+    _BOX_TMPL.format_map({"title": title, **by_status[s]}) for s, title in _STATUS_TITLES.items()
 )
+st.markdown(_KPI_HEADER_TMPL.format_map({"top": html_top, "boxes": html_boxes}), unsafe_allow_html=True)
 
 # =========================================================
 # CHARTS – REVENUE SHARE: BLACK LABELS | BAR: WHITE LABELS
 # =========================================================
 st.subheader("Visuals")
 
-chart = pd.DataFrame([
-    {"Status": s, "Revenue": by_status[s]["amt"], "Customers": by_status[s]["act"], "ARPU": by_status[s]["rpc"]}
-    for s in ["ACT", "COM", "VIP"]
-])
+chart = current.rename(
+    columns={"status": "Status", "amt": "Revenue", "act": "Customers", "rpc": "ARPU"}
+)[["Status", "Revenue", "Customers", "ARPU"]].reset_index(drop=True)
 
 act_color = "#49d0ff"
 com_color = "#3ddc97"
 vip_color = "#aaaaaa"
 
-l, r2 = st.columns(2)
-
-# ---------- Revenue Share (Pie) – BLACK TEXT ----------
-with l:
-    st.markdown("**Revenue Share**")
-    chart_f = chart[chart["Revenue"] > 0]
-    if not chart_f.empty:
-        base = (
-            alt.Chart(chart_f)
-            .transform_joinaggregate(total="sum(Revenue)")
-            .transform_calculate(pct="datum.Revenue / datum.total")
-            .properties(width=300, height=300)
-        )
-        arcs = base.mark_arc(innerRadius=60).encode(
-            theta="Revenue:Q",
-            color=alt.Color(
-                "Status:N",
-                scale=alt.Scale(domain=["ACT","COM","VIP"], range=[act_color, com_color, vip_color]),
-                legend=None,
-            ),
-            tooltip=[
-                alt.Tooltip("Status:N"),
-                alt.Tooltip("Revenue:Q", format="$.2f"),
-                alt.Tooltip("Customers:Q", format=",.0f"),
-                alt.Tooltip("ARPU:Q", format="$.2f"),
-                alt.Tooltip("pct:Q", format=".1%", title="Share"),
-            ],
-        )
-        labels = base.mark_text(
-            radius=95,
-            fontSize=15,
-            fontWeight="normal",
-            color="#000000"  # BLACK TEXT
-        ).encode(
-            theta="Revenue:Q",
-            text=alt.Text("label:N")
-        ).transform_calculate(
-            label="datum.Status + ' ' + format(datum.pct, '.1%')"
-        )
-        st.altair_chart(
-            (arcs + labels).configure_view(strokeWidth=0)
-            .configure_axis(labelColor="#ffffff", titleColor="#ffffff", gridColor="#222222", domainColor="#222222"),
-            use_container_width=True,
+# Shared by every session and keyed on the chart frame, so bounded like the
+# parse cache; st.altair_chart still serializes the spec on each run.
+@st.cache_resource(max_entries=16)
+def _revenue_share_chart(chart_f: pd.DataFrame):
+    # Shared transforms/theta: both layers reuse one data pipeline.
+    base = (
+        alt.Chart(chart_f)
+        .transform_joinaggregate(total="sum(Revenue)")
+        .transform_calculate(
+            pct="datum.Revenue / datum.total",
+            label="datum.Status + ' ' + format(datum.pct, '.1%')",
         )
-    else:
-        st.write("No revenue data to display.")
+        .encode(theta="Revenue:Q")
+        .properties(width=300, height=300)
+    )
+    arcs = base.mark_arc(innerRadius=60).encode(
+        color=alt.Color(
+            "Status:N",
+            scale=alt.Scale(domain=["ACT","COM","VIP"], range=[act_color, com_color, vip_color]),
+            legend=None,
+        ),
+        tooltip=[
+            alt.Tooltip("Status:N"),
+            alt.Tooltip("Revenue:Q", format="$.2f"),
+            alt.Tooltip("Customers:Q", format=",.0f"),
+            alt.Tooltip("ARPU:Q", format="$.2f"),
+            alt.Tooltip("pct:Q", format=".1%", title="Share"),
+        ],
+    )
+    labels = base.mark_text(
+        radius=95,
+        fontSize=15,
+        fontWeight="normal",
+        color="#000000"  # BLACK TEXT
+    ).encode(
+        text=alt.Text("label:N")
+    )
+    return (
+        (arcs + labels).configure_view(strokeWidth=0)
+        .configure_axis(labelColor="#ffffff", titleColor="#ffffff", gridColor="#222222", domainColor="#222222")
+    )
 
-# ---------- Active Customers by Status (Bar) – WHITE TEXT ----------
-with r2:
-    st.markdown("**Active Customers by Status**")
-    base = alt.Chart(chart).properties(width=300, height=300)
+@st.cache_resource(max_entries=16)
+def _customers_chart(chart: pd.DataFrame):
+    base = alt.Chart(chart).encode(
+        x=alt.X("Status:N", sort=["ACT","COM","VIP"], axis=alt.Axis(labelColor="#ffffff", titleColor="#ffffff")),
+        y=alt.Y("Customers:Q", axis=alt.Axis(labelColor="#ffffff", titleColor="#ffffff", gridColor="#222222")),
+    ).properties(width=300, height=300)
     bars = base.mark_bar(
         color=act_color,
         stroke=com_color,
@@ -593,8 +596,6 @@ with r2:
         cornerRadiusTopLeft=6,
         cornerRadiusTopRight=6,
     ).encode(
-        x=alt.X("Status:N", sort=["ACT","COM","VIP"], axis=alt.Axis(labelColor="#ffffff", titleColor="#ffffff")),
-        y=alt.Y("Customers:Q", axis=alt.Axis(labelColor="#ffffff", titleColor="#ffffff", gridColor="#222222")),
         tooltip=[
             alt.Tooltip("Status:N"),
             alt.Tooltip("Customers:Q", format=",.0f"),
@@ -608,24 +609,46 @@ with r2:
         fontWeight="normal",
         color="#ffffff"  # WHITE TEXT
     ).encode(
-        x=alt.X("Status:N", sort=["ACT","COM","VIP"]),
-        y=alt.Y("Customers:Q"),
         text=alt.Text("Customers:Q", format=",.0f"),
     )
-    st.altair_chart(
+    return (
         (bars + labels).configure_view(strokeWidth=0)
-        .configure_axis(labelColor="#ffffff", titleColor="#ffffff", gridColor="#222222", domainColor="#222222"),
-        use_container_width=True,
+        .configure_axis(labelColor="#ffffff", titleColor="#ffffff", gridColor="#222222", domainColor="#222222")
     )
 
+l, r2 = st.columns(2)
+
+# ---------- Revenue Share (Pie) – BLACK TEXT ----------
+with l:
+    st.markdown("**Revenue Share**")
+    chart_f = chart[chart["Revenue"] > 0]
+    if not chart_f.empty:
+        st.altair_chart(_revenue_share_chart(chart_f), use_container_width=True)
+    else:
+        st.write("No revenue data to display.")
+
+# ---------- Active Customers by Status (Bar) – WHITE TEXT ----------
+with r2:
+    st.markdown("**Active Customers by Status**")
+    st.altair_chart(_customers_chart(chart), use_container_width=True)
+
 # =========================================================
 # EXPORTS - PERFECT BLACK
 # =========================================================
-png_bytes = export_snapshot_png(period_label, grand, by_status)
-pdf_bytes = export_snapshot_pdf(period_label, grand, by_status)
-
-col1, col2 = st.columns(2)
-col1.download_button("Download Snapshot (PNG)", png_bytes, f"ftth_snapshot_{period_label}.png", "image/png")
-col2.download_button("Download Snapshot (PDF)", pdf_bytes, f"ftth_snapshot_{period_label}.pdf", "application/pdf")
-
-st.caption("FTTH Dashboard snapshot includes KPIs and charts as a static image.")
+# A fragment, so the prepare and download clicks rerun only this section
+# rather than the whole dashboard.
+@st.fragment
+def render_exports(period_label, grand, by_status):
+    # Rendering is deferred until asked for once per session; afterwards the
+    # cached exports keep the download buttons cheap on every rerun.
+    if st.session_state.get("export_ready") or st.button("Prepare snapshot downloads"):
+        st.session_state["export_ready"] = True
+        png_bytes, pdf_bytes = export_snapshots(period_label, grand, by_status)
+
+        col1, col2 = st.columns(2)
+        col1.download_button("Download Snapshot (PNG)", png_bytes, f"ftth_snapshot_{period_label}.png", "image/png")
+        col2.download_button("Download Snapshot (PDF)", pdf_bytes, f"ftth_snapshot_{period_label}.pdf", "application/pdf")
+
+render_exports(period_label, grand, by_status)
+
+st.caption("FTTH Dashboard snapshot includes KPIs and charts, as a PNG image or a vector PDF.")
@@ -0,0 +1,166 @@
+# pdf_parse.py
+import io
+import os
+import re
+import datetime as dt
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Optional
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+    import pdfplumber
+
+# =========================================================
+# PDF PARSING
+# Lives outside app.py so worker processes can import it:
+# Streamlit executes the script as a synthetic __main__.
+# =========================================================
+_DATE_RE = re.compile(r"Date:.{0,200}?([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})", re.DOTALL)
+# Status headers and the grand-total line in one alternation, so each page is
+# scanned once; m.lastgroup says which branch matched. Only the header branch
+# is case-insensitive.
+_ROW_RE = re.compile(
+    r'(?P<header>(?i:Customer\s+Status\s*",\s*"(?P<status>ACT|COM|VIP)"\s*,\s*"(?:Active\s+residential|Active\s+Commercial|VIP)"\s*,\s*"[0-9,]+"\s*,\s*"(?P<act>[0-9,]+)"))'
+    r'|(?P<total>Total\s*:\s*(?P<subs>[0-9,]+)\s+(?P<total_act>[0-9,]+)\s+\$(?P<total_amt>[0-9,.\(\)-]+))')
+_STATUSES = ("ACT", "COM", "VIP")
+_DOLLAR_RE = re.compile(r"\$([0-9][0-9,.\(\)-]*)")
+# Enough of the previous page to hold a straddling header plus its 300-char amount window.
+_TAIL_CHARS = 600
+
+# PDFium is not thread-safe and Streamlit runs each session's script on its own
+# thread, so every in-process PDFium call goes through this lock.
+_PDFIUM_LOCK = threading.Lock()
+
+_INT_TBL = str.maketrans("", "", ",")
+_AMT_TBL = str.maketrans({",": "", "(": "-", ")": ""})
+
+def _clean_int(s):
+    return int(s.translate(_INT_TBL))
+
+def _clean_amt(s):
+    return float(s.translate(_AMT_TBL))
+
+def _iter_pdf_pages(pdf_bytes: bytes) -> Iterator[str]:
+    # PDFium (C) is far faster than pdfplumber's pure-Python pdfminer stack.
+    # PyMuPDF is not an option: it drops the hidden [CsvExport1] fields the
+    # status headers are matched against.
+    if pdfium is None:
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            for p in pdf.pages:
+                yield p.extract_text() or ""
+        return
+    # The lock is taken per page rather than across the yield, so one session
+    # never holds PDFium while the caller scans its text.
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        n_pages = len(pdf)
+    try:
+        for i in range(n_pages):
+            with _PDFIUM_LOCK:
+                page = pdf[i]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+            yield text
+    finally:
+        with _PDFIUM_LOCK:
+            pdf.close()
+
+def _extract_date_label(text: str) -> Optional[str]:
+    # PDFium emits header labels before their values ("Date: Page: ... 11/12/2025"),
+    # so take the first date that follows the label rather than requiring adjacency.
+    m = _DATE_RE.search(text)
+    if m:
+        try:
+            return dt.date(int(m.group(3)), int(m.group(1)), int(m.group(2))).isoformat()
+        except Exception:
+            pass
+    return None
+
+def _amount_before(text: str, pos: int) -> float:
+    # Last "$amount" in the 300 chars before pos: walk back and stop at the
+    # first "$" that starts an amount.
+    lo = max(0, pos - 300)
+    idx = text.rfind("$", lo, pos)
+    while idx != -1:
+        m = _DOLLAR_RE.match(text, idx, pos)
+        if m:
+            return _clean_amt(m.group(1))
+        idx = text.rfind("$", lo, idx)
+    return 0.0
+
+def parse_one_pdf(pdf_bytes: bytes):
+    """Return (grand, by_status, report_date); report_date is None if absent.
+
+    Pages are scanned one at a time with the tail of the previous page
+    carried over, so the full document text is never held in memory. The
+    patterns tolerate any whitespace, so page text is matched as extracted.
+    """
+    # Flat per-status accumulators; the nested by_status dict is built once at the end.
+    acts = dict.fromkeys(_STATUSES, 0)
+    amts = dict.fromkeys(_STATUSES, 0.0)
+    grand = None
+    report_date = None
+    tail = ""
+    for page in _iter_pdf_pages(pdf_bytes):
+        if not page:
+            continue
+        buf = f"{tail}\n{page}" if tail else page
+        # Matches ending inside the carried tail were handled on the previous page.
+        new_from = len(buf) - len(page)
+        for m in _ROW_RE.finditer(buf):
+            if m.end() <= new_from:
+                continue
+            if m.lastgroup == "header":
+                status = m.group("status").upper()
+                acts[status] += _clean_int(m.group("act"))
+                amts[status] += _amount_before(buf, m.start())
+            elif grand is None:
+                grand = {
+                    "subs": _clean_int(m.group("subs")),
+                    "act": _clean_int(m.group("total_act")),
+                    "amt": _clean_amt(m.group("total_amt"))
+                }
+        if report_date is None:
+            report_date = _extract_date_label(buf)
+        tail = buf[-_TAIL_CHARS:]
+    by_status = {s: {"act": acts[s], "amt": amts[s]} for s in _STATUSES}
+    if grand is None:
+        grand = {"act": sum(acts.values()), "amt": sum(amts.values())}
+    return grand, by_status, report_date
+
+# =========================================================
+# BATCH PARSING (ONE WORKER PROCESS PER PDF)
+# =========================================================
+def _reset_pdfium_lock():
+    # Pool initializer: a forked worker inherits _PDFIUM_LOCK in the state the
+    # parent held it at fork time, i.e. locked by parse_many below.
+    global _PDFIUM_LOCK
+    _PDFIUM_LOCK = threading.Lock()
+
+def parse_many(pdfs: List[bytes]):
+    """parse_one_pdf over several PDFs; results keep the input order."""
+    # Only fork is usable here: spawn/forkserver re-import __main__, which under
+    # Streamlit is app.py itself.
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    if len(pdfs) < 2 or not can_fork:
+        return [parse_one_pdf(b) for b in pdfs]
+    results = [None] * len(pdfs)
+    with ProcessPoolExecutor(
+        max_workers=min(len(pdfs), os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_reset_pdfium_lock,
+    ) as ex:
+        # With fork, the first submit launches every worker at once. Holding the
+        # PDFium lock across it means no other session thread is inside PDFium
+        # (or holding the lock) when the process is copied.
+        with _PDFIUM_LOCK:
+            futures = {ex.submit(parse_one_pdf, b): i for i, b in enumerate(pdfs)}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+    return results